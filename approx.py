@@ -1,35 +1,39 @@
+import numpy as np
 import txt2graph
+import distinguish
 
-def _minhitset(edgeset: set, matset: set, edges: list=None):
+def _minhitset(edgeset: set, alive: np.array, dist: distinguish.Distinguisher,
+               edges: list=None):
     if not edges:
         edges = []
 
-    while edgeset and matset:
-        dqlst = (None, matset)
+    while edgeset and alive.any():
         # finds the edge that has the fewest graphs in common
-        for edge in edgeset:
-            dqlst = min(
-                dqlst,
-                (edge, [mat for mat in matset if mat[edge[0]][edge[1]] == 1]),
-                key=lambda x: len(x[1])
-            )
+        candidates = list(edgeset)
+        cols = [dist.position[edge] for edge in candidates]
+        common = dist.has[alive][:, cols].sum(axis=0)
+        best = int(np.argmin(common))
+        if common[best] == np.count_nonzero(alive):
+            # no edge rules out any of the remaining graphs
+            return None
         # records best edge
-        edges.append(dqlst[0])
+        edges.append(candidates[best])
         # removes edge
-        edgeset.remove(dqlst[0])
+        edgeset.remove(candidates[best])
         # consider only the remaining graphs
-        matset = dqlst[1]
+        alive = alive & dist.has[:, cols[best]]
     return edges if edgeset else None
    
 
 
 def minhitset(mats):
+    dist = distinguish.Distinguisher(mats)
     res = []
     for i, mat1 in enumerate(mats):
         edges = txt2graph.edgeset(mat1)
 
-        copy = [mat for mat in mats if not (mat==mat1).all()]
-        res.append(_minhitset(edges, copy, []))
+        # every graph other than mat1 has to be ruled out
+        res.append(_minhitset(edges, ~dist.same[i], dist, []))
     return res
 
 if __name__ == "__main__":
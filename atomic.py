@@ -0,0 +1,46 @@
+import os
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+"""atomic.py
+
+Atomic file writes for the derived files (sidecar caches, indexes, chain
+libraries and their side tables). The contents are written to a hidden
+temporary file in the directory of the target, then renamed over it once
+complete, so a partial file never appears under the target name.
+
+The temporary file is created with mode 0o666 like open does, so the kernel
+applies the umask and the renamed file gets the usual mode.
+"""
+
+def _create(fname: str) -> tuple[int, str]:
+    # exclusive creation, retried on the unlikely name clash
+    dirname, base = os.path.split(os.path.abspath(fname))
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp = os.path.join(dirname, ".{}.{}.tmp".format(base, uuid.uuid4().hex))
+        try:
+            return os.open(tmp, flags, 0o666), tmp
+        except FileExistsError:
+            continue
+
+@contextmanager
+def atomicwrite(fname: str) -> Iterator[BinaryIO]:
+    """Context manager opening a temporary file for binary writing, renamed to
+    fname when the body completes, and removed if it raises.
+
+    Args:
+        fname (str): Filename
+
+    Yields:
+        Iterator[BinaryIO]: File to write to
+    """
+    fd, tmp = _create(fname)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp, fname)
+    except BaseException:
+        os.remove(tmp)
+        raise
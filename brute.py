@@ -1,6 +1,6 @@
 from itertools import chain, combinations
-import numpy as np
 import txt2graph
+import distinguish
 
 def powerset(i):
     """Creates the powerset of an iterable.
@@ -40,27 +40,19 @@ def bruteforce(matrices: list) -> list:
     Returns:
         set: Set of edges that uniquely identifies each matrix.
     """
+    dist = distinguish.Distinguisher(matrices)
+    # graphs whose edges are all in some other graph are never identified
+    hopeless = set(dist.hopeless())
     res = []
     for i, mat in enumerate(matrices):
+        if i in hopeless:
+            res.append(None)
+            continue
         # print("considering graph {}".format(i))
         for j, pset in enumerate(powerset(txt2graph.edgeset(mat))):
             # print("considering powerset {}".format(j))
-            found = False
-            for mat2 in matrices:
-                # ignore the same matrix
-                if np.array_equal(mat, mat2):
-                    continue
-                # check to see if the edges can identify the given matrix
-                valid = True
-                for edge in pset:
-                    if mat2[edge[0]][edge[1]] == 0:
-                        valid = False
-                # if so, invalid edge set
-                if valid:
-                    break
-            # if no breaks, match was found, do not have to consider more sets
-            else:
-                found = True
+            # check to see if every other matrix lacks one of the edges
+            if dist.identifies(i, pset):
                 # print("match found")
                 # print(pset)
                 res.append(pset)
@@ -0,0 +1,49 @@
+import numpy as np
+import fastgraph
+from lattice import Lattice
+
+"""chains.py
+
+Loading of the chain libraries saved by genseq, and of their contacts, shared
+by the scripts working on libraries (hpmodel, contactindex).
+"""
+
+def library(fname: str) -> list:
+    """Loads the chains saved by genseq, in order.
+
+    Args:
+        fname (str): Filename, for instance chains2/14.npz.
+
+    Returns:
+        list: List of lattice representations of amino acid chains.
+    """
+    with np.load(fname) as data:
+        return [data["arr_{}".format(i)] for i in range(len(data.files))]
+
+def contactlist(
+    lattices: list, lat: Lattice=None
+) -> tuple[np.array, np.array]:
+    """Gathers the contacts of every chain of a library, that is adjacent amino
+    acids i < j, 0-indexed, with j > i + 1.
+
+    Args:
+        lattices (list): List of lattice representations of amino acid chains
+        of the same length.
+        lat (Lattice, optional): Lattice of the chains. Defaults to the
+        hypercubic lattice of the dimension of the chains.
+
+    Returns:
+        tuple: (contacts, 2) array of contact pairs and (chains + 1) array of
+        offsets of the contacts of each chain.
+    """
+    pairs = []
+    counts = [0]
+    for lattice in lattices:
+        length = int(np.count_nonzero(np.asarray(lattice) > 0))
+        adjs = fastgraph.arr2adjs(lattice, length, lat)
+        i, col = np.nonzero(adjs - 1 > np.arange(length)[:, None] + 1)
+        pairs.append(np.stack([i, adjs[i, col] - 1], axis=-1))
+        counts.append(len(i))
+    if not pairs:
+        return np.zeros((0, 2), dtype=int), np.zeros(1, dtype=int)
+    return np.concatenate(pairs), np.cumsum(counts)
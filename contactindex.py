@@ -0,0 +1,176 @@
+import argparse
+import os
+import numpy as np
+import chains
+import txt2graph
+from atomic import atomicwrite
+from lattice import Lattice, latticeof
+from typing import Iterable
+
+"""contactindex.py
+
+Inverted index of the contacts of a chain library, stored next to it as
+chains2/{n}.index.npz. For every contact (i, j), 0-indexed with j > i + 1, the
+index holds the sorted posting list of the ids (positions in the library) of
+the chains having it. Queries for chains having some contacts and not others
+are answered by intersecting and subtracting posting lists, without loading
+the chains.
+
+Contacts are identified by their code i * length + j. The index stores the
+sorted codes, the offsets of their posting lists and the concatenated posting
+lists, along with the hash of the library it was built from and the name of
+its lattice.
+"""
+
+# bump whenever the layout of the index changes
+INDEXVERSION = 2
+
+def indexname(fname: str) -> str:
+    """Name of the index of a library.
+
+    Args:
+        fname (str): Filename of the library, for instance chains2/14.npz.
+
+    Returns:
+        str: Filename of the index
+    """
+    return os.path.splitext(fname)[0] + ".index.npz"
+
+def buildindex(fname: str, lat: Lattice=None) -> dict:
+    """Builds the index of a library and saves it next to the library. The
+    index is written atomically (see atomic.atomicwrite), so a partial index
+    is never read.
+
+    Args:
+        fname (str): Filename of the library
+        lat (Lattice, optional): Lattice of the library. Defaults to the one
+        recorded next to it, see lattice.latticeof.
+
+    Returns:
+        dict: The index, see loadindex.
+    """
+    digest = txt2graph.filehash(fname)
+    lattices = chains.library(fname)
+    length = int(np.count_nonzero(lattices[0] > 0)) if lattices else 0
+    if lat is None:
+        lat = latticeof(fname, np.ndim(lattices[0]) if lattices else 2)
+    pairs, indptr = chains.contactlist(lattices, lat)
+
+    codes = pairs[:, 0] * length + pairs[:, 1]
+    ids = np.repeat(np.arange(len(lattices)), np.diff(indptr))
+    order = np.lexsort((ids, codes))
+    codes, counts = np.unique(codes[order], return_counts=True)
+    index = {
+        "version": INDEXVERSION,
+        "hash": digest,
+        "lattice": lat.name,
+        "dim": lat.dim,
+        "length": length,
+        "chains": len(lattices),
+        "codes": codes,
+        "indptr": np.concatenate([[0], np.cumsum(counts)]),
+        "ids": ids[order],
+    }
+
+    with atomicwrite(indexname(fname)) as f:
+        np.savez(f, **index)
+    return index
+
+def loadindex(fname: str, lat: Lattice=None) -> dict:
+    """Loads the index of a library, rebuilding it with buildindex if it is
+    missing, or was built from another version of the library, on another
+    lattice or with another INDEXVERSION.
+
+    Args:
+        fname (str): Filename of the library
+        lat (Lattice, optional): Lattice of the library. Defaults to the one
+        recorded next to it, see lattice.latticeof.
+
+    Returns:
+        dict: Dictionary with the length of the chains, the number of chains,
+        and the codes, indptr and ids arrays of the posting lists.
+    """
+    try:
+        with np.load(indexname(fname)) as data:
+            index = {key: data[key] for key in data.files}
+        digest = txt2graph.filehash(fname)
+        if index["version"] != INDEXVERSION or index["hash"] != digest:
+            return buildindex(fname, lat)
+        if lat is None:
+            lat = latticeof(fname, int(index["dim"]))
+        if index["lattice"] != lat.name:
+            return buildindex(fname, lat)
+    except (OSError, KeyError, ValueError):
+        return buildindex(fname, lat)
+    index["length"] = int(index["length"])
+    index["chains"] = int(index["chains"])
+    return index
+
+def postings(index: dict, edge: tuple[int, int]) -> np.array:
+    """Returns the sorted ids of the chains having a contact. Consecutive amino
+    acids are adjacent in every chain.
+
+    Args:
+        index (dict): Index of a library
+        edge (tuple): Pair of distinct 0-indexed amino acids, in any order.
+
+    Returns:
+        np.array: Sorted chain ids
+    """
+    i, j = sorted(edge)
+    if not 0 <= i < j < index["length"]:
+        raise ValueError("no contact {} in chains of length {}".format(
+            tuple(edge), index["length"]
+        ))
+    if j - i == 1:
+        return np.arange(index["chains"])
+    code = i * index["length"] + j
+    pos = np.searchsorted(index["codes"], code)
+    if pos == len(index["codes"]) or index["codes"][pos] != code:
+        return np.zeros(0, dtype=int)
+    return index["ids"][index["indptr"][pos]:index["indptr"][pos + 1]]
+
+def query(
+    index: dict, has: Iterable[tuple[int, int]]=(),
+    nts: Iterable[tuple[int, int]]=()
+) -> np.array:
+    """Finds the chains of a library that have all contacts of has and none of
+    nts. Posting lists are intersected shortest first, so the work is bounded
+    by the rarest contact.
+
+    Args:
+        index (dict): Index of a library
+        has (iterable, optional): Contacts the chains must have. Defaults to
+        none.
+        nts (iterable, optional): Contacts the chains must not have. Defaults
+        to none.
+
+    Returns:
+        np.array: Sorted chain ids
+    """
+    lists = sorted((postings(index, edge) for edge in has), key=len)
+    res = lists[0] if lists else np.arange(index["chains"])
+    for ids in lists[1:]:
+        if not len(res):
+            break
+        res = np.intersect1d(res, ids, assume_unique=True)
+    for edge in nts:
+        if not len(res):
+            break
+        res = np.setdiff1d(res, postings(index, edge), assume_unique=True)
+    return res
+
+def main():
+    parser = argparse.ArgumentParser(description="Query chains by contacts.")
+    parser.add_argument("length", type=int)
+    parser.add_argument("--has", nargs="*", default=[], help="contacts as i,j")
+    parser.add_argument("--nts", nargs="*", default=[], help="contacts as i,j")
+    parser.add_argument("--dir", default="chains2")
+    args = parser.parse_args()
+    index = loadindex("{}/{}.npz".format(args.dir, args.length))
+    has = [tuple(int(x) for x in edge.split(",")) for edge in args.has]
+    nts = [tuple(int(x) for x in edge.split(",")) for edge in args.nts]
+    print(query(index, has, nts))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import numpy as np
+from array import array
+from atomic import atomicwrite
+
+"""degeneracy.py
+
+Side table of the walks behind each chain of a library. genseqswrapper keeps
+one chain per contact graph (class); the table records, in library order, how
+many walks have each class and optionally which ones, for entropy and free
+energy calculations.
+
+Enumeration only generates one walk per orbit under the point group of the
+lattice (see Lattice.walks), so a recorded walk stands for its whole orbit:
+its weight is the size of the orbit, and the degeneracy of a class is the sum
+of the weights of its walks. Walks are recorded by walk id (see
+Lattice.walkid), from which Lattice.orbit recovers every walk of the orbit.
+
+While enumerating, the counts are one array with an entry per class, to
+which the weight of each walk is added. With walk ids, the table is instead
+three flat arrays with one entry per walk, class, weight and walk id, so
+recording a walk is an append and never a comparison. They are grouped by
+class when saved, as offsets into the walk ids sorted by class, stored next
+to the library as chains2/{n}.deg.npz.
+"""
+
+class Degeneracy:
+    """Walks per class, filled during enumeration.
+
+    Fields:
+        walkids: Whether walk ids are recorded, on top of the counts.
+        totals: Number of walks of each class, if not walkids.
+        classes: Class of each recorded walk, if walkids.
+        weights: Number of walks each recorded walk stands for, if walkids.
+        ids: Walk id of each recorded walk, if walkids.
+    """
+    def __init__(self, walkids: bool=False):
+        """Initializer for the table. Consider class docstring for more detail.
+
+        Args:
+            walkids (bool, optional): Whether to record walk ids. Defaults to
+            False.
+        """
+        self.walkids = walkids
+        self.totals = array("q")
+        self.classes = array("q")
+        self.weights = array("q")
+        self.ids = array("Q")
+
+    def add(self, cls: int, weight: int, walkid: int=None) -> None:
+        """Records a walk.
+
+        Args:
+            cls (int): Index of the class of the walk in the library
+            weight (int): Number of walks the walk stands for
+            walkid (int, optional): Walk id, recorded if walkids. Defaults to
+            None.
+        """
+        if self.walkids:
+            self.classes.append(cls)
+            self.weights.append(weight)
+            self.ids.append(walkid)
+            return
+        if cls >= len(self.totals):
+            self.totals.extend([0] * (cls + 1 - len(self.totals)))
+        self.totals[cls] += weight
+
+    def counts(self) -> np.array:
+        """Returns the number of walks of each class.
+
+        Returns:
+            np.array: Degeneracy of each class, in library order.
+        """
+        if not self.walkids:
+            return np.array(self.totals, dtype=np.int64)
+        return np.bincount(
+            np.array(self.classes, dtype=np.int64),
+            weights=np.array(self.weights, dtype=np.int64)
+        ).astype(np.int64)
+
+    def tables(self) -> dict:
+        """Returns the table grouped by class.
+
+        Returns:
+            dict: Dictionary with counts, the degeneracy of each class, and if
+            walkids, indptr, ids and weights: the walks of class c are
+            ids[indptr[c]:indptr[c + 1]], standing for as many walks as their
+            weights.
+        """
+        res = {"counts": self.counts()}
+        if self.walkids:
+            classes = np.array(self.classes, dtype=np.int64)
+            order = np.argsort(classes, kind="stable")
+            sizes = np.bincount(classes, minlength=len(res["counts"]))
+            res["indptr"] = np.concatenate([[0], np.cumsum(sizes)])
+            res["ids"] = np.array(self.ids, dtype=np.uint64)[order]
+            res["weights"] = np.array(self.weights, dtype=np.int64)[order]
+        return res
+
+    def save(self, fname: str) -> None:
+        """Saves the table grouped by class (see tables). The table is written
+        atomically (see atomic.atomicwrite), so a partial table is never read.
+
+        Args:
+            fname (str): Filename, for instance chains2/14.deg.npz.
+        """
+        with atomicwrite(fname) as f:
+            np.savez_compressed(f, **self.tables())
+
+def load(fname: str) -> dict:
+    """Loads a table saved by Degeneracy.save.
+
+    Args:
+        fname (str): Filename
+
+    Returns:
+        dict: See Degeneracy.tables.
+    """
+    with np.load(fname) as data:
+        return {key: data[key] for key in data.files}
@@ -0,0 +1,89 @@
+import numpy as np
+import txt2graph
+
+"""distinguish.py
+
+Shared precomputation for the edge set solvers (brute, approx, fakeid3), which
+all repeatedly ask which edges graph a has that graph b lacks.
+
+Every graph is stored as a bitset over the union of the edge sets (see
+txt2graph.edgeset) of all graphs, packed 8 edges per byte. The edges graph a
+has that graph b lacks are then bits[a] & ~bits[b], and their number is a
+popcount, done for all pairs at once with a byte lookup table.
+
+An edge set made of edges of graph a identifies it if and only if every other
+graph lacks one of the edges. Hence a graph b with no edge distinguishing a
+from it, while not being equal to a, means no edge set identifies a.
+"""
+
+# number of set bits of every byte
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+class Distinguisher:
+    """Pairwise distinguishing edges of a list of graphs.
+
+    Fields:
+        edges: Sorted list of all edges of the graphs.
+        position: Mapping of edge to its bit in the bitsets.
+        has: (graphs, edges) boolean array, whether a graph has an edge.
+        bits: (graphs, bytes) array of packed bitsets of the graphs.
+        counts: (graphs, graphs) array, the number of edges graph a has that
+        graph b lacks at [a, b].
+        same: (graphs, graphs) boolean array, whether two graphs are equal.
+    """
+    def __init__(self, mats: list):
+        """Initializer for the precomputation. Consider class docstring for
+        more detail.
+
+        Args:
+            mats (list): List of adjacency matrices of the same size
+        """
+        edgesets = [txt2graph.edgeset(mat) for mat in mats]
+        self.edges = sorted(set().union(*edgesets))
+        self.position = {edge: k for k, edge in enumerate(self.edges)}
+
+        stacked = np.array(mats)
+        rows = [edge[0] for edge in self.edges]
+        cols = [edge[1] for edge in self.edges]
+        self.has = stacked[:, rows, cols] == 1
+        self.bits = np.packbits(self.has, axis=1)
+
+        self.counts = np.empty((len(mats), len(mats)), dtype=int)
+        for a in range(len(mats)):
+            self.counts[a] = POPCOUNT[self.diff(a)].sum(axis=1)
+        self.same = (self.counts == 0) & (self.counts.T == 0)
+
+    def diff(self, a: int) -> np.array:
+        """Returns the bitsets of the edges graph a has that each graph lacks.
+
+        Args:
+            a (int): Index of a graph
+
+        Returns:
+            np.array: (graphs, bytes) array of packed bitsets.
+        """
+        return self.bits[a] & ~self.bits
+
+    def identifies(self, a: int, edges) -> bool:
+        """Determines whether edges of graph a identify it, that is every other
+        graph lacks one of the edges.
+
+        Args:
+            a (int): Index of a graph
+            edges (iterable): Edges of graph a
+
+        Returns:
+            bool: If the edges identify graph a.
+        """
+        cols = [self.position[edge] for edge in edges]
+        hit = ~self.has[:, cols].all(axis=1)
+        return bool((hit | self.same[a]).all())
+
+    def hopeless(self) -> list:
+        """Finds the graphs that no edge set identifies.
+
+        Returns:
+            list: Indices of the graphs
+        """
+        blocked = (self.counts == 0) & ~self.same
+        return np.flatnonzero(blocked.any(axis=1)).tolist()
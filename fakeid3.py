@@ -1,4 +1,5 @@
 import txt2graph
+import distinguish
 import numpy as np
 
 class Node:
@@ -11,28 +12,34 @@ class Node:
         nts: Non-exhaustive list of edges all graphs that the node describes
         do not have
         mats: List of adjacency matrices of graphs the node describes.
+        ids: Indices of the graphs the node describes, in the list of all
+        graphs.
         edge: Potential edge
         left: Left node, all graphs from the node that do not have the potential
         edge.
         right: Right node, all graphs from the node that do have the potential
         edge.
     """
-    def __init__(self, has, nts, mats):
+    def __init__(self, has, nts, mats, ids):
         """Initailizer for a node. Consider class docstring for more detail.
 
         Args:
             has (list): List of edges
             nts (list): List of edges
             mats (list): List of adjacency matrices
+            ids (np.array): Indices of the graphs
         """
         self.has = txt2graph.copy(has)
         self.nts = txt2graph.copy(nts)
         self.mats = txt2graph.copy(mats)
+        self.ids = ids
         self.left = None
         self.right = None
 
 def id3wrapper(mats):
     ans = txt2graph.copy(mats)
+    # which graph has which edge, computed once for all nodes
+    dist = distinguish.Distinguisher(mats)
     def id3(node: Node, nodes: int=None) -> Node:
         """Implements a pseudo ID3 algorithm for graphs. For each node, considers
         all edges in the list of graphs it describes, and identifies the edge that
@@ -66,36 +73,41 @@ def id3wrapper(mats):
         if len(node.mats) == 0:
             return None
 
-        # Creates a list of edges and the graphs that contain it
+        # Creates a list of edges and whether each graph contains it
         edges = []
         for i in range(nodes):
             for j in range(i + 1, nodes):
                 if (i, j) in node.has or (i, j) in node.nts: # no repeats
                     continue
-                grphs = txt2graph.validate([(i, j)], node.mats)
-                if grphs:
-                    edges.append((i, j, grphs))
+                # matrices are symmetric, and edgeset keeps (j, i)
+                col = dist.position.get((j, i))
+                if col is None:
+                    continue
+                inside = dist.has[node.ids, col]
+                if inside.any():
+                    edges.append((i, j, inside))
         # Finds the edge that most closely splits the list in half
-        edge = min(edges, key=lambda x: int(abs((len(node.mats) / 2) - len(x[2]))))
+        edge = min(edges, key=lambda x: int(abs((len(node.mats) / 2) - x[2].sum())))
 
         # List of all matrices that do not contain the edge
-        nots = [mat for mat in node.mats if mat[edge[0]][edge[1]] == 0]
+        nots = [mat for mat, inside in zip(node.mats, edge[2]) if not inside]
+        yes = [mat for mat, inside in zip(node.mats, edge[2]) if inside]
         
         # Recurse on left
-        node.left = Node(node.has, node.nts, nots)
+        node.left = Node(node.has, node.nts, nots, node.ids[~edge[2]])
         node.left.nts.append((edge[0], edge[1]))
         node.left = id3(node.left, nodes)
         
         # Recurse of right
         node.has.append((edge[0], edge[1]))
-        node.right = Node(node.has, node.nts, edge[2])
+        node.right = Node(node.has, node.nts, yes, node.ids[edge[2]])
         node.right = id3(node.right, nodes)
 
         # Denote the edge for the node
         node.edge = (edge[0], edge[1])
 
         return node
-    id3(Node([], [], mats))
+    id3(Node([], [], mats, np.arange(len(mats))))
     return ans
 
 def traverse(node, edges=None) -> set:
@@ -1,6 +1,7 @@
 import numpy as np
 
 from itertools import product
+from lattice import SQUARE
 from typing import Iterator, Iterable
 
 """fastgenseq.py
@@ -10,7 +11,7 @@ A rewrite of genseq.py with local space in mind, and lower level data.
 Functions to generate 2-dimensional non-isomorphic amino acid chains up to some
 length. Our approach is to generate sequences of relative directions from an
 origin (sequence of up,down,left,right, etc) through the ismorphism to
-{0, 1, 2, 3}; in particular:
+indices of the offsets of lattice.SQUARE; in particular:
     0 -- up
     1 -- right
     2 -- down
@@ -32,7 +33,7 @@ def gendirs(length: int) -> Iterator[Iterable[int]]:
     Yields:
         Iterator[Iterable[int]]: Iterator of direction sequences
     """
-    yield product(range(4), repeat=length)
+    yield product(range(len(SQUARE.offsets)), repeat=length)
 
 def genseq(dir: Iterator[Iterable[int]]) -> np.array:
     """Creates an amino acid chain from a sequence of directions, if possible.
@@ -1,4 +1,5 @@
 import numpy as np
+from lattice import Lattice, hypercubic
 
 """
 A rewrite of txt2graph.py with local space in mind, and lower level data.
@@ -16,79 +17,41 @@ amino acids, we can instead do a n x 2 * dim adjacency (uh, array) instead,
 since we label from 0 to n - 1 anyways.
 """
 
-def arr2adjs(arr: np.array, length: int) -> np.array:
-    """Converts an array into an adjacency array.
+def arr2adjs(arr: np.array, length: int, lat: Lattice=None) -> np.array:
+    """Converts an array of any dimension into an adjacency array.
 
     For performance reasons, the adjacency array is padded with -1s on the
-    right end if there is extra space.
+    right end if there is extra space. Both -1 and 0 are treated as empty
+    positions, so lattices from compact.txt and from genseq are accepted.
 
     Args:
         arr (np.array): Lattice representation of amino acid chain.
         length (int): Number of amino acids.
+        lat (Lattice, optional): Lattice of the chain. Defaults to the
+        hypercubic lattice of the dimension of arr.
 
     Returns:
-        np.array: Adjacency array.
+        np.array: Adjacency array of shape (length, neighbors), that is
+        (length, 2 * dim) for hypercubic lattices.
     """
-    adjs = np.full((length, 4), -1)
-    maxrow, maxcol = arr.shape
-    for i, row in enumerate(arr):
-        for j, entry in enumerate(row):
-            if entry == -1:
-                continue
-            adj = []
-            # sorting is faster then manually checking and padding
-            if i == 0:
-                if j == 0:
-                    adj.append(arr[i + 1][j])
-                    adj.append(arr[i][j + 1])
-                    adj.append(-1)
-                    adj.append(-1)
-                elif j == maxcol - 1:
-                    adj.append(arr[i + 1][j])
-                    adj.append(arr[i][j - 1])
-                    adj.append(-1)
-                    adj.append(-1)
-                else:
-                    adj.append(arr[i + 1][j])
-                    adj.append(arr[i][j + 1])
-                    adj.append(arr[i][j - 1])
-                    adj.append(-1)
-            elif i == maxrow - 1:
-                if j == 0:
-                    adj.append(arr[i - 1][j])
-                    adj.append(arr[i][j + 1])
-                    adj.append(-1)
-                    adj.append(-1)
-                elif j == maxcol - 1:
-                    adj.append(arr[i - 1][j])
-                    adj.append(arr[i][j - 1])
-                    adj.append(-1)
-                    adj.append(-1)
-                else:
-                    adj.append(arr[i - 1][j])
-                    adj.append(arr[i][j + 1])
-                    adj.append(arr[i][j - 1])
-                    adj.append(-1)
-            else:
-                if j == 0:
-                    adj.append(arr[i + 1][j])
-                    adj.append(arr[i - 1][j])
-                    adj.append(arr[i][j + 1])
-                    adj.append(-1)
-                elif j == maxcol - 1:
-                    adj.append(arr[i + 1][j])
-                    adj.append(arr[i - 1][j])
-                    adj.append(arr[i][j - 1])
-                    adj.append(-1)
-                else:
-                    adj.append(arr[i + 1][j])
-                    adj.append(arr[i - 1][j])
-                    adj.append(arr[i][j + 1])
-                    adj.append(arr[i][j - 1])
-            
-            adj.sort(reverse=True)
-            adjs[entry - 1] = np.array(adj)
-    return adjs
+    arr = np.asarray(arr)
+    if lat is None:
+        lat = hypercubic(arr.ndim)
+    return lat.arr2adjs(arr, length)
+
+def reverse(adjs: np.array) -> np.array:
+    """Relabels an adjacency array as if the amino acid chain went backward,
+    that is vertex v becomes length + 1 - v.
+
+    Args:
+        adjs (np.array): Adjacency array of amino acid chain.
+
+    Returns:
+        np.array: Adjacency array of the reversed amino acid chain.
+    """
+    adjs = np.asarray(adjs)[::-1]
+    relabeled = np.where(adjs > 0, len(adjs) + 1 - adjs, adjs)
+    return -np.sort(-relabeled, axis=-1)
 
 def isograph(adjs1: np.array, adjs2: np.array) -> bool:
     """Determines from adjacency arrays if amino acid chains are isomorphic.
@@ -105,5 +68,39 @@ def isograph(adjs1: np.array, adjs2: np.array) -> bool:
     Returns:
         bool: If the two amino acid chains are isomorphic.
     """
-    return np.array_equal(adjs1, adjs2) or np.array_equal(np.fliplr(adjs1), adjs2)
-    
\ No newline at end of file
+    return np.array_equal(adjs1, adjs2) or np.array_equal(reverse(adjs1), adjs2)
+
+def isographs(adjs: np.array, library: np.array) -> np.array:
+    """Determines which amino acid chains of a library are isomorphic to a given
+    amino acid chain, comparing both labelings (see isograph) against the
+    whole library at once.
+
+    Args:
+        adjs (np.array): (length, 2 * dim) adjacency array of amino acid chain.
+        library (np.array): (k, length, 2 * dim) stacked adjacency arrays.
+
+    Returns:
+        np.array: Sorted indices of the isomorphic chains of the library.
+    """
+    library = np.asarray(library)
+    axes = tuple(range(1, library.ndim))
+    matches = (library == adjs).all(axis=axes)
+    matches |= (library == reverse(adjs)).all(axis=axes)
+    return np.flatnonzero(matches)
+
+def canonkey(adjs: np.array) -> bytes:
+    """Computes a canonical key of an adjacency array, equal for two arrays if
+    and only if they are isomorphic (see isograph). The key is the smaller of
+    the bytes of both labelings as little-endian 16-bit integers, so it does
+    not depend on the platform or the dtype of the array.
+
+    Args:
+        adjs (np.array): Adjacency array of amino acid chain.
+
+    Returns:
+        bytes: Canonical key
+    """
+    return min(
+        np.ascontiguousarray(adjs, dtype="<i2").tobytes(),
+        np.ascontiguousarray(reverse(adjs), dtype="<i2").tobytes()
+    )
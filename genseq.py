@@ -1,36 +1,50 @@
+import argparse
+import os
+import queue
+import threading
+import zipfile
 import numpy as np
 import txt2graph
 import itertools
+from atomic import atomicwrite
+from degeneracy import Degeneracy
+from instrument import Stats
+from lattice import LATTICES, Lattice, hypercubic, savelattice
+from spill import SpillDedupe
+from typing import Iterator
 # from tqdm import tqdm
 
-def gendirs(length, dim: int=2):
-    return (itertools.product(list(range(2 ** dim)), repeat=length))
+def _lattice(dim: int, lat: Lattice=None) -> Lattice:
+    # lattices default to the hypercubic lattice of the dimension
+    return lat if lat is not None else hypercubic(dim)
 
-def genseq(length, dirs, dim: int=2):
-    lattice = np.zeros([2 * length - 1] * dim, dtype=int)
+def gendirs(length, dim: int=2, lat: Lattice=None):
+    lat = _lattice(dim, lat)
+    return (itertools.product(list(range(len(lat.offsets))), repeat=length))
+
+def genseq(length, dirs, dim: int=2, lat: Lattice=None):
+    lat = _lattice(dim, lat)
+    lattice = np.zeros([2 * length - 1] * lat.dim, dtype=int)
     counter = 1
-    coords = [length - 1] * dim
-    mins = [length - 1] * dim
-    maxs = [length - 1] * dim
+    coords = [length - 1] * lat.dim
+    mins = [length - 1] * lat.dim
+    maxs = [length - 1] * lat.dim
     lattice[tuple(coords)] = 1
 
-    mid = 2 ** (dim - 1)
     for dr in dirs:
         counter += 1
-        if dr < mid:
-            coords[dr] += 1
-            maxs[dr] = max(maxs[dr], coords[dr])
-        else:
-            dr -= mid
-            coords[dr] -= 1
-            mins[dr] = min(mins[dr], coords[dr])
+        for axis, step in enumerate(lat.offsets[dr]):
+            coords[axis] += step
+            mins[axis] = min(mins[axis], coords[axis])
+            maxs[axis] = max(maxs[axis], coords[axis])
         if lattice[tuple(coords)] != 0:
             return None
         lattice[tuple(coords)] = counter
     return lattice[tuple([slice(x, y + 1) for x, y in zip(mins, maxs)])]
 
-def genseqs(length, dim: int=2):
-    return (genseq(length, dr, dim) for dr in gendirs(length - 1, dim))
+def genseqs(length, dim: int=2, lat: Lattice=None):
+    dirs = gendirs(length - 1, dim, lat)
+    return (genseq(length, dr, dim, lat=lat) for dr in dirs)
 
 def isograph(m1, m2):
     adjl1 = txt2graph.arr2adjl(m1)
@@ -52,21 +66,349 @@ def isograph(m1, m2):
             return False
     return True
 
-def genseqswrapper(length:int, dim: int=2) -> None:
+def contactkey(
+    sites: list[int], length: int, dim: int=2, lat: Lattice=None,
+    reversal: bool=False
+) -> bytes:
+    """Computes a key of the contact graph of a walk, so that two walks have the
+    same key if and only if their contact graphs are equal. The library keeps
+    a chain and its reversal apart, as isograph always did, unless reversal is
+    set.
+
+    Contacts (i, j), j > i + 1, are set as bits of an upper triangular bitset,
+    returned as (length * (length - 1) / 2 + 7) // 8 bytes, so keys of a given
+    length all have the same size. With reversal, the smaller of the bitsets
+    of the chain and of the reversed chain is returned instead.
+
+    Args:
+        sites (list): Packed coordinates, see Lattice.walks.
+        length (int): Number of amino acids
+        dim (int, optional): Dimension of the lattice. Defaults to 2.
+        lat (Lattice, optional): Lattice of the walk. Defaults to the
+        hypercubic lattice of dimension dim.
+        reversal (bool, optional): Whether a chain and its reversal get the
+        same key. Defaults to False.
+
+    Returns:
+        bytes: Key of the contact graph
+    """
+    def bit(i: int, j: int) -> int:
+        return 1 << (i * (2 * length - i - 1) // 2 + j - i - 1)
+
+    steps = _lattice(dim, lat).steps(length)
+    index = {site: i for i, site in enumerate(sites)}
+    fwd = rev = 0
+    for i, site in enumerate(sites):
+        for step in steps:
+            j = index.get(site + step)
+            if j is not None and j > i + 1:
+                fwd |= bit(i, j)
+                if reversal:
+                    rev |= bit(length - 1 - j, length - 1 - i)
+    key = min(fwd, rev) if reversal else fwd
+    return key.to_bytes((length * (length - 1) // 2 + 7) // 8, "little")
+
+def countseqs(
+    length: int, dim: int=2, lat: Lattice=None, reversal: bool=False
+) -> Stats:
+    """Counts the distinct contact graphs of chains of a given length, without
+    keeping any lattice. Walks are streamed through a dictionary from
+    contactkey to the number of walks with that contact graph, so unique is
+    the number of chains genseqswrapper keeps.
+
+    The statistics are returned as counters walks (number of self-avoiding
+    walks) and unique (number of distinct contact graphs), and histograms
+    contacts (contact graphs per number of contacts), degeneracy (contact
+    graphs per number of walks having it) and bbox (walks per bounding box,
+    with extents sorted in decreasing order).
+
+    Args:
+        length (int): Number of amino acids
+        dim (int, optional): Dimension of the lattice. Defaults to 2.
+        lat (Lattice, optional): Lattice of the chains. Defaults to the
+        hypercubic lattice of dimension dim.
+        reversal (bool, optional): Whether to count a contact graph and its
+        reversal once, see contactkey. Defaults to False.
+
+    Returns:
+        Stats: Statistics of the chains
+    """
+    lat = _lattice(dim, lat)
+    res = Stats()
+    degeneracy = {}
+    for sites, walks in lat.walks(length):
+        coords = lat.unpack(sites, length)
+        extents = coords.max(axis=0) - coords.min(axis=0) + 1
+        key = contactkey(sites, length, lat=lat, reversal=reversal)
+        degeneracy[key] = degeneracy.get(key, 0) + walks
+        res.count("walks", walks)
+        bbox = "x".join(str(x) for x in sorted(extents, reverse=True))
+        res.tally("bbox", bbox, walks)
+
+    res.count("unique", len(degeneracy))
+    for key, walks in degeneracy.items():
+        res.tally("contacts", bin(int.from_bytes(key, "little")).count("1"))
+        res.tally("degeneracy", walks)
+    return res
+
+def genseqswrapper(
+    length:int, dim: int=2, stats: Stats=None, lat: Lattice=None,
+    deg: Degeneracy=None, reversal: bool=False
+) -> list:
+    # chains are deduplicated by contactkey, so each walk costs one lookup
+    # rather than a comparison with every chain found so far. Walks come in
+    # the order of gendirs, so the first walk of each contact graph, and the
+    # order of the chains, are the ones the comparisons kept.
+    lat = _lattice(dim, lat)
+    if deg is not None and deg.walkids:
+        if len(lat.offsets) ** (length - 1) >= 2 ** 64:
+            raise ValueError(
+                "walk ids of length {} do not fit in 64 bits".format(length)
+            )
+    classes = {}
     res = []
-    for seq in genseqs(length, dim):
-        if seq is not None:
-            for oldseq in res:
-                if isograph(oldseq, seq):
-                    break
-            else:
-                res.append(seq)
-    
+    if stats is None:
+        for sites, walks in lat.walks(length):
+            key = contactkey(sites, length, lat=lat, reversal=reversal)
+            cls = classes.get(key)
+            if cls is None:
+                cls = classes[key] = len(res)
+                res.append(lat.tolattice(sites, length))
+            if deg is not None:
+                walkid = lat.walkid(sites, length) if deg.walkids else None
+                deg.add(cls, walks, walkid)
+        return res
+
+    # same loop as above, with every stage timed and counted
+    walks = lat.walks(length, stats)
+    while True:
+        with stats.timer("walk"):
+            sites, weight = next(walks, (None, None))
+        if sites is None:
+            break
+        # each walk stands for its whole orbit, as in countseqs
+        stats.count("walks", weight)
+        with stats.timer("dedupe"):
+            key = contactkey(sites, length, lat=lat, reversal=reversal)
+            cls = classes.get(key)
+        if cls is None:
+            with stats.timer("crop"):
+                cls = classes[key] = len(res)
+                res.append(lat.tolattice(sites, length))
+        if deg is not None:
+            with stats.timer("degeneracy"):
+                walkid = lat.walkid(sites, length) if deg.walkids else None
+                deg.add(cls, weight, walkid)
+    stats.count("unique", len(res))
     return res
 
-def main():
-    for i in range(1, 25 + 1):
-        np.savez_compressed("chains2/{}".format(i), *genseqswrapper(i))
+def genseqsext(
+    length: int, dim: int=2, chunk: int=1 << 20, tmpdir: str=None,
+    lat: Lattice=None, reversal: bool=False
+) -> Iterator[np.array]:
+    """Generates one chain per distinct contact graph, like genseqswrapper,
+    with bounded memory. Each walk is spilled as a record of its contactkey,
+    its sequence number and its packed coordinates to a SpillDedupe. The
+    deduplicated records come out in key order, so they are spilled again
+    keyed by sequence number, and the chains are rebuilt in the order
+    genseqswrapper keeps them.
+
+    Args:
+        length (int): Number of amino acids
+        dim (int, optional): Dimension of the lattice. Defaults to 2.
+        chunk (int, optional): Maximal number of distinct keys held in
+        memory. Defaults to 1 << 20.
+        tmpdir (str, optional): Directory for the sorted runs. Defaults to the
+        system temporary directory.
+        lat (Lattice, optional): Lattice of the chains. Defaults to the
+        hypercubic lattice of dimension dim.
+        reversal (bool, optional): Whether to keep a single chain for a
+        contact graph and its reversal, see contactkey. Defaults to False.
+
+    Yields:
+        Iterator[np.array]: Lattice representations of the chains.
+    """
+    lat = _lattice(dim, lat)
+    keysize = (length * (length - 1) // 2 + 7) // 8
+    recsize = keysize + 8 + 8 * length
+    with SpillDedupe(keysize, recsize, chunk, tmpdir=tmpdir) as dedupe, \
+            SpillDedupe(8, recsize - keysize, chunk, tmpdir=tmpdir) as ordered:
+        for i, (sites, _) in enumerate(lat.walks(length)):
+            dedupe.add(
+                contactkey(sites, length, lat=lat, reversal=reversal)
+                + i.to_bytes(8, "big")
+                + np.array(sites, dtype=">i8").tobytes()
+            )
+        for record in dedupe:
+            ordered.add(record[keysize:])
+        for record in ordered:
+            sites = np.frombuffer(record[8:], dtype=">i8")
+            yield lat.tolattice(sites.tolist(), length)
+
+def savezstream(fname: str, arrs: Iterator[np.array]) -> None:
+    """Saves arrays in the format of np.savez_compressed, writing them one at a
+    time so the arrays need not all be held in memory. The file is written
+    atomically (see atomic.atomicwrite), so a partial file never appears under
+    fname.
+
+    Args:
+        fname (str): Filename, including the .npz extension.
+        arrs (Iterator[np.array]): Arrays, saved as arr_0, arr_1, ...
+    """
+    with atomicwrite(fname) as out, zipfile.ZipFile(
+        out, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True
+    ) as zf:
+        for i, arr in enumerate(arrs):
+            with zf.open("arr_{}.npy".format(i), "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(arr))
+
+class Writer:
+    """Background thread saving chains with savezstream while enumeration goes
+    on. Compression releases the GIL, so it overlaps with the enumeration of
+    the next length. Jobs go through a bounded queue, so at most maxsize
+    lengths of chains wait in memory.
+
+    Fields:
+        queue: Queue of pending jobs.
+        error: First exception raised while saving, reraised by put and close.
+        thread: The writer thread.
+    """
+    def __init__(self, maxsize: int=1):
+        """Initializer for the writer. Starts the writer thread.
+
+        Args:
+            maxsize (int, optional): Maximal number of pending jobs. Defaults
+            to 1.
+        """
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            # after a failure, keep draining so put never blocks forever
+            if self.error is not None:
+                continue
+            fname, arrs, stats = job
+            try:
+                if stats is None:
+                    savezstream(fname, arrs)
+                    continue
+                with stats.timer("save"):
+                    savezstream(fname, arrs)
+                stats.count("bytes", os.path.getsize(fname))
+                stats.dump(os.path.splitext(fname)[0] + ".json")
+            except BaseException as e:
+                self.error = e
+
+    def put(self, fname: str, arrs: list, stats: Stats=None) -> None:
+        """Queues arrays to be saved, blocking while the queue is full.
+
+        Args:
+            fname (str): Filename, including the .npz extension.
+            arrs (list): Arrays to save
+            stats (Stats, optional): Stats to add the save time and size to,
+            then dump next to the file. Defaults to None.
+        """
+        if self.error is not None:
+            raise self.error
+        self.queue.put((fname, arrs, stats))
+
+    def close(self) -> None:
+        """Waits for every pending job to be saved."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+def main(
+    instrument: bool=False, dim: int=2, maxlength: int=25, count: bool=False,
+    external: bool=False, lattice: str=None, walkids: bool=None,
+    reversal: bool=False
+):
+    """Enumerates chains of every length and saves them to chains{dim}/, or
+    chains{lattice}/ for a named lattice, along with the name of the lattice
+    (see lattice.latticeof).
+
+    Args:
+        instrument (bool, optional): Whether to also collect timers and
+        counters for each length, written to chains{dim}/{length}.json.
+        Ignored with count or external. Defaults to False.
+        dim (int, optional): Dimension of the lattice. Defaults to 2.
+        maxlength (int, optional): Longest chain to enumerate. Defaults to 25.
+        count (bool, optional): Whether to only count the chains with
+        countseqs, writing chains{dim}/{length}.counts.json instead of the
+        chains. Defaults to False.
+        external (bool, optional): Whether to deduplicate on disk with
+        genseqsext, for lengths whose chains do not fit in memory. Defaults to
+        False.
+        lattice (str, optional): Name of a lattice of lattice.LATTICES, used
+        instead of the hypercubic lattice of dimension dim. Defaults to None.
+        walkids (bool, optional): Whether to also save the degeneracy of each
+        chain to chains{dim}/{length}.deg.npz: the number of walks only if
+        False, along with the walk ids if True. Defaults to None, saving
+        nothing.
+        reversal (bool, optional): Whether to count a contact graph and its
+        reversal once, with count only. The saved chains always keep both, so
+        they can be scored by hpmodel. Defaults to False.
+    """
+    lat = LATTICES[lattice] if lattice else hypercubic(dim)
+    outdir = "chains{}".format(lattice if lattice else dim)
+    os.makedirs(outdir, exist_ok=True)
+    savelattice(outdir, lat)
+    with Writer() as writer:
+        for i in range(1, maxlength + 1):
+            fname = os.path.join(outdir, str(i))
+            if count:
+                stats = countseqs(i, lat=lat, reversal=reversal)
+                stats.dump(fname + ".counts.json")
+                continue
+            if external:
+                savezstream(fname + ".npz", genseqsext(i, lat=lat))
+                continue
+            stats = Stats() if instrument else None
+            deg = Degeneracy(walkids) if walkids is not None else None
+            seqs = genseqswrapper(i, stats=stats, lat=lat, deg=deg)
+            writer.put(fname + ".npz", seqs, stats)
+            if deg is not None:
+                deg.save(fname + ".deg.npz")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Enumerate amino acid chains.")
+    parser.add_argument("--instrument", action="store_true")
+    parser.add_argument("--dim", type=int, default=2)
+    parser.add_argument("--maxlength", type=int, default=25)
+    parser.add_argument("--count", action="store_true")
+    parser.add_argument("--external", action="store_true")
+    parser.add_argument("--lattice", choices=sorted(LATTICES))
+    parser.add_argument(
+        "--reversal", action="store_true",
+        help="with --count, count a contact graph and its reversal once"
+    )
+    parser.add_argument(
+        "--degeneracy", choices=["counts", "walks"],
+        help="save walks per chain, as counts or along with walk ids"
+    )
+    args = parser.parse_args()
+    if args.instrument and (args.count or args.external):
+        parser.error("--instrument cannot be used with --count or --external")
+    if args.degeneracy is not None and (args.count or args.external):
+        parser.error("--degeneracy cannot be used with --count or --external")
+    if args.reversal and not args.count:
+        parser.error("--reversal can only be used with --count")
+    walkids = None if args.degeneracy is None else args.degeneracy == "walks"
+    main(
+        args.instrument, args.dim, args.maxlength, args.count, args.external,
+        args.lattice, walkids, args.reversal
+    )
@@ -0,0 +1,161 @@
+import argparse
+import numpy as np
+import fastgraph
+from chains import contactlist, library
+from collections import Counter
+from lattice import Lattice, hypercubic, latticeof
+from typing import Iterable, Union
+
+"""hpmodel.py
+
+Scores stored amino acid chains under the HP model: amino acids are either
+hydrophobic (H) or polar (P), and the energy of a conformation is minus the
+number of contacts between two H amino acids that are not consecutive in the
+chain.
+
+Rather than looping over chains, the contacts of every chain of a library are
+gathered into one sparse incidence structure (see chains.contactlist): an
+array of contact pairs, with the contacts of chain c at rows indptr[c] to
+indptr[c + 1]. Scoring a batch of sequences is then one gather of the H
+indicator matrix at the contact pairs, and one segmented sum over the chains.
+
+The energy of a conformation depends on the direction of the chain, so
+exhaustive folding needs a library holding both orientations of every chain,
+as genseq saves them. bothorientations checks it, once per library since it
+goes through every chain, and fold runs it on request.
+"""
+
+def bothorientations(lattices: list, lat: Lattice=None) -> bool:
+    """Determines whether a library holds the reversal of each of its chains, up
+    to isomorphism. Chains are grouped by fastgraph.canonkey, which is shared
+    by a chain and its reversal, and each group must hold one chain per
+    orientation: one if the chain is its own reversal, two otherwise.
+
+    Args:
+        lattices (list): List of lattice representations of amino acid chains
+        of the same length.
+        lat (Lattice, optional): Lattice of the chains. Defaults to the
+        hypercubic lattice of the dimension of the chains.
+
+    Returns:
+        bool: If every chain has its reversal in the library.
+    """
+    keys = []
+    orientations = []
+    for lattice in lattices:
+        length = int(np.count_nonzero(np.asarray(lattice) > 0))
+        adjs = fastgraph.arr2adjs(lattice, length, lat)
+        keys.append(fastgraph.canonkey(adjs))
+        palindrome = np.array_equal(adjs, fastgraph.reverse(adjs))
+        orientations.append(1 if palindrome else 2)
+    counts = Counter(keys)
+    return all(counts[key] == n for key, n in zip(keys, orientations))
+
+def hindicator(seqs: Union[str, Iterable[str]]) -> np.array:
+    """Converts H/P sequences into an H indicator matrix.
+
+    Args:
+        seqs (str or iterable): A sequence or sequences of Hs and Ps of the
+        same length.
+
+    Returns:
+        np.array: (sequences, length) integer array, 1 where the amino acid is
+        hydrophobic.
+    """
+    if isinstance(seqs, str):
+        seqs = [seqs]
+    seqs = [seq.upper() for seq in seqs]
+    if len({len(seq) for seq in seqs}) > 1:
+        raise ValueError("sequences must all have the same length")
+    for seq in seqs:
+        if set(seq) - {"H", "P"}:
+            raise ValueError("sequence {} is not made of H and P".format(seq))
+    return np.array([[c == "H" for c in seq] for seq in seqs], dtype=int)
+
+def energies(
+    seqs: Union[str, Iterable[str]], pairs: np.array, indptr: np.array,
+    length: int
+) -> np.array:
+    """Computes the HP energy of every chain of a library for every sequence.
+
+    Args:
+        seqs (str or iterable): A sequence or sequences of Hs and Ps, as many
+        as the chains have amino acids.
+        pairs (np.array): Contact pairs, see contactlist.
+        indptr (np.array): Offsets of the contacts of each chain, see
+        contactlist.
+        length (int): Number of amino acids of the chains
+
+    Returns:
+        np.array: (sequences, chains) array of energies.
+    """
+    h = hindicator(seqs)
+    if h.shape[1] != length:
+        raise ValueError("sequences of length {} for chains of length {}".format(
+            h.shape[1], length
+        ))
+    # 1 for each contact between two H, per sequence
+    hh = h[:, pairs[:, 0]] * h[:, pairs[:, 1]]
+    # segmented sum over the contacts of each chain
+    cumulative = np.zeros((len(h), len(pairs) + 1), dtype=int)
+    np.cumsum(hh, axis=1, out=cumulative[:, 1:])
+    return -(cumulative[:, indptr[1:]] - cumulative[:, indptr[:-1]])
+
+def fold(
+    seqs: Union[str, Iterable[str]], lattices: list, lat: Lattice=None,
+    check: bool=False
+) -> list[dict]:
+    """Exhaustively folds sequences over a library of chains, which must hold
+    both orientations of every chain (see bothorientations).
+
+    Args:
+        seqs (str or iterable): A sequence or sequences of Hs and Ps.
+        lattices (list): Nonempty list of lattice representations of amino
+        acid chains, as many amino acids as the sequences.
+        lat (Lattice, optional): Lattice of the chains. Defaults to the
+        hypercubic lattice of the dimension of the chains.
+        check (bool, optional): Whether to check the library with
+        bothorientations first, for libraries of unknown origin. Defaults to
+        False.
+
+    Returns:
+        list: For each sequence, a dictionary with the ground state energy,
+        the indices of the ground state chains in the library, and the
+        histogram of energies as a dictionary from energy to number of chains.
+    """
+    if not len(lattices):
+        raise ValueError("the library is empty")
+    if check and not bothorientations(lattices, lat):
+        name = lat.name if lat else hypercubic(np.ndim(lattices[0])).name
+        raise ValueError(
+            "the library lacks the reversal of some chains, or is not on the "
+            "{} lattice".format(name)
+        )
+    if isinstance(seqs, str):
+        seqs = [seqs]
+    length = int(np.count_nonzero(np.asarray(lattices[0]) > 0))
+    scores = energies(seqs, *contactlist(lattices, lat), length)
+    res = []
+    for score in scores:
+        energy = score.min(initial=0)
+        values, counts = np.unique(score, return_counts=True)
+        res.append({
+            "energy": int(energy),
+            "ground": np.flatnonzero(score == energy),
+            "hist": dict(zip(values.tolist(), counts.tolist())),
+        })
+    return res
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold H/P sequences.")
+    parser.add_argument("seqs", nargs="+")
+    parser.add_argument("--dir", default="chains2")
+    args = parser.parse_args()
+    fname = "{}/{}.npz".format(args.dir, len(args.seqs[0]))
+    lattices = library(fname)
+    lat = latticeof(fname, np.ndim(lattices[0]) if lattices else 2)
+    for seq, res in zip(args.seqs, fold(args.seqs, lattices, lat, True)):
+        print(seq, res["energy"], len(res["ground"]), res["hist"])
+
+if __name__ == "__main__":
+    main()
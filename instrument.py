@@ -0,0 +1,84 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator
+
+"""instrument.py
+
+Opt-in instrumentation for the enumeration scripts. A Stats object collects
+per-stage wall time, plain counters and keyed counters (histograms), and can
+be dumped as JSON. Instrumented functions take a stats argument defaulting to
+None, and only touch it behind an `if stats is not None` check, so a run
+without instrumentation does no extra work.
+"""
+
+class Stats:
+    """Collection of stage timers and counters for a single run.
+
+    Fields:
+        timers: Mapping of stage name to accumulated seconds.
+        counters: Mapping of counter name to count.
+        hists: Mapping of histogram name to a mapping of key to count.
+    """
+    def __init__(self):
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.hists = defaultdict(lambda: defaultdict(int))
+
+    def count(self, name: str, n: int=1) -> None:
+        """Increments a counter.
+
+        Args:
+            name (str): Counter name
+            n (int, optional): Amount to increment by. Defaults to 1.
+        """
+        self.counters[name] += n
+
+    def tally(self, name: str, key, n: int=1) -> None:
+        """Increments the bucket of a histogram.
+
+        Args:
+            name (str): Histogram name
+            key: Bucket of the histogram, for instance a step number.
+            n (int, optional): Amount to increment by. Defaults to 1.
+        """
+        self.hists[name][key] += n
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Context manager adding the wall time of its body to a stage timer.
+
+        Args:
+            name (str): Stage name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+
+    def asdict(self) -> dict:
+        """Returns the collected statistics as a JSON serializable dictionary.
+        Histogram keys are converted to strings and sorted.
+
+        Returns:
+            dict: Dictionary with timers, counters and hists entries.
+        """
+        return {
+            "timers": dict(self.timers),
+            "counters": dict(self.counters),
+            "hists": {
+                name: {str(k): hist[k] for k in sorted(hist)}
+                for name, hist in self.hists.items()
+            },
+        }
+
+    def dump(self, fname: str) -> None:
+        """Writes the collected statistics to a JSON file.
+
+        Args:
+            fname (str): Filename
+        """
+        with open(fname, "w") as f:
+            json.dump(self.asdict(), f, indent=2)
@@ -0,0 +1,381 @@
+import itertools
+import os
+import numpy as np
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+"""lattice.py
+
+Lattices on which amino acid chains are placed, each defined by its table of
+neighbor offsets. Enumeration, contact extraction and reconstruction all go
+through the table, so a new lattice type only needs its offsets and point
+group:
+    square -- the 2-dimensional lattice of genseq, 4 neighbors
+    cubic -- the 3-dimensional lattice, 6 neighbors
+    triangular -- 2-dimensional, in axial coordinates, 6 neighbors
+    fcc -- face-centered cubic, 12 neighbors
+
+A direction is an index into the offsets. For hypercubic lattices, direction
+d < dim steps +1 along axis d, and direction d >= dim steps -1 along axis
+d - dim, as genseq always did.
+
+Walks are lists of packed coordinates: a chain of length amino acids started
+in the middle of a lattice of side 2 * length - 1 never leaves it, as offsets
+have entries in {-1, 0, 1}, so coordinates are packed as digits in base
+2 * length - 1, and a step is the addition of a packed offset.
+
+Arrays do not say which lattice they were placed on, so genseq records the
+name of the lattice of a library directory in its lattice.txt, read back by
+latticeof.
+"""
+
+def _closure(generators: list[np.array]) -> list[np.array]:
+    # group generated by integer matrices
+    group = [np.eye(len(generators[0]), dtype=int)]
+    seen = {group[0].tobytes()}
+    for elem in group:
+        for gen in generators:
+            prod = gen @ elem
+            if prod.tobytes() not in seen:
+                seen.add(prod.tobytes())
+                group.append(prod)
+    return group
+
+class Lattice:
+    """A lattice defined by a table of neighbor offsets.
+
+    Fields:
+        name: Name of the lattice.
+        offsets: (neighbors, dim) array of offsets of the neighbors of a
+        position.
+        dim: Dimension of the lattice.
+        perms: Point group of the lattice, as tuples mapping each direction to
+        its image.
+    """
+    def __init__(self, name: str, offsets, symmetries: Iterable=None):
+        """Initializer for a lattice. Consider class docstring for more detail.
+
+        Args:
+            name (str): Name of the lattice
+            offsets (array like): Offsets of the neighbors of a position
+            symmetries (iterable, optional): (dim, dim) integer matrices
+            generating the point group of the lattice. Defaults to none.
+        """
+        self.name = name
+        self.offsets = np.array(offsets, dtype=int)
+        self.dim = self.offsets.shape[1]
+        index = {tuple(offset): d for d, offset in enumerate(self.offsets)}
+        group = [np.eye(self.dim, dtype=int)]
+        if symmetries:
+            group = _closure(list(symmetries))
+        self.perms = [
+            tuple(index[tuple(mat @ offset)] for offset in self.offsets)
+            for mat in group
+        ]
+
+    def __repr__(self):
+        return "Lattice({!r})".format(self.name)
+
+    def strides(self, length: int) -> np.array:
+        """Returns the strides used to pack coordinates into integers.
+
+        Args:
+            length (int): Number of amino acids
+
+        Returns:
+            np.array: Stride of each axis
+        """
+        return (2 * length - 1) ** np.arange(self.dim)
+
+    def steps(self, length: int) -> list[int]:
+        """Returns the packed offsets, that is the amount added to a packed
+        coordinate by a step in each direction.
+
+        Args:
+            length (int): Number of amino acids
+
+        Returns:
+            list: Packed offset of each direction
+        """
+        return (self.offsets @ self.strides(length)).tolist()
+
+    def walks(self, length: int, stats=None) -> Iterator[tuple[list[int], int]]:
+        """Generates self-avoiding walks of length amino acids as lists of packed
+        coordinates.
+
+        Walks are built by backtracking, checking occupancy in a hash set, so a
+        collision prunes every walk sharing the prefix. Only one walk per class
+        under the point group is generated, the one whose sequence of
+        directions is lexicographically smallest. While extending a walk, the
+        symmetries mapping it to itself so far are kept: a step mapped to a
+        smaller direction by one of them prunes the walk, and the ones left at
+        the end are the stabilizer of the walk. Since contact graphs are
+        invariant under the point group, no contact graph is lost.
+
+        Args:
+            length (int): Number of amino acids
+            stats (Stats, optional): Collects collisions per step. Defaults to
+            None.
+
+        Yields:
+            Iterator[tuple[list[int], int]]: Packed coordinates of the amino
+            acids, and the number of walks of the class. The list is reused
+            between walks, copy it to keep it.
+        """
+        steps = self.steps(length)
+        order = len(self.perms)
+        origin = (length - 1) * int(self.strides(length).sum())
+        sites = [origin]
+        occupied = {origin}
+
+        def extend(alive: list) -> Iterator[tuple[list[int], int]]:
+            if len(sites) == length:
+                yield sites, order // len(alive)
+                return
+            for d, step in enumerate(steps):
+                still = []
+                for perm in alive:
+                    if perm[d] < d:
+                        break
+                    if perm[d] == d:
+                        still.append(perm)
+                else:
+                    site = sites[-1] + step
+                    if site in occupied:
+                        if stats is not None:
+                            stats.tally("collisions", len(sites))
+                        continue
+                    sites.append(site)
+                    occupied.add(site)
+                    yield from extend(still)
+                    sites.pop()
+                    occupied.remove(site)
+
+        return extend(self.perms)
+
+    def walkid(self, sites: list[int], length: int) -> int:
+        """Packs a walk into an integer: the sequence of its directions, as
+        digits in base the number of directions, first step least
+        significant.
+
+        Args:
+            sites (list): Packed coordinates
+            length (int): Number of amino acids
+
+        Returns:
+            int: Walk id
+        """
+        directions = {step: d for d, step in enumerate(self.steps(length))}
+        res = 0
+        for prev, site in zip(reversed(sites[:-1]), reversed(sites[1:])):
+            res = res * len(self.offsets) + directions[site - prev]
+        return res
+
+    def fromwalkid(self, walkid: int, length: int) -> list[int]:
+        """Unpacks a walk id, see walkid.
+
+        Args:
+            walkid (int): Walk id
+            length (int): Number of amino acids
+
+        Returns:
+            list: Packed coordinates
+        """
+        steps = self.steps(length)
+        sites = [(length - 1) * int(self.strides(length).sum())]
+        for _ in range(length - 1):
+            walkid, d = divmod(int(walkid), len(steps))
+            sites.append(sites[-1] + steps[d])
+        return sites
+
+    def orbit(self, walkid: int, length: int) -> list[int]:
+        """Returns the walk ids of the orbit of a walk under the point group,
+        by mapping each of its directions through every symmetry. Its size is
+        the weight Lattice.walks yields with the walk.
+
+        Args:
+            walkid (int): Walk id
+            length (int): Number of amino acids
+
+        Returns:
+            list: Sorted walk ids, without duplicates
+        """
+        base = len(self.offsets)
+        digits = []
+        for _ in range(length - 1):
+            walkid, d = divmod(int(walkid), base)
+            digits.append(d)
+        res = set()
+        for perm in self.perms:
+            image = 0
+            for d in reversed(digits):
+                image = image * base + perm[d]
+            res.add(image)
+        return sorted(res)
+
+    def unpack(self, sites: list[int], length: int) -> np.array:
+        """Unpacks packed coordinates.
+
+        Args:
+            sites (list): Packed coordinates
+            length (int): Number of amino acids
+
+        Returns:
+            np.array: (len(sites), dim) array of coordinates.
+        """
+        return np.array(sites)[:, None] // self.strides(length) % (2 * length - 1)
+
+    def tolattice(self, sites: list[int], length: int) -> np.array:
+        """Places a walk on the smallest array containing it, numbering the
+        amino acids from 1 and leaving empty positions 0, as genseq does.
+
+        Args:
+            sites (list): Packed coordinates
+            length (int): Number of amino acids
+
+        Returns:
+            np.array: Lattice representation of the chain.
+        """
+        coords = self.unpack(sites, length)
+        coords -= coords.min(axis=0)
+        lattice = np.zeros(coords.max(axis=0) + 1, dtype=int)
+        lattice[tuple(coords.T)] = np.arange(1, len(sites) + 1)
+        return lattice
+
+    def shifted(self, arr: np.array, fill: int) -> list[np.array]:
+        """Returns, for each direction, the array of the entries found one step
+        away from each position, fill outside of the array.
+
+        Args:
+            arr (np.array): Lattice representation of an amino acid chain
+            fill (int): Entry used outside of the array
+
+        Returns:
+            list: Arrays of the same shape as arr.
+        """
+        padded = np.pad(arr, 1, constant_values=fill)
+        return [
+            padded[tuple(
+                slice(1 + o, 1 + o + n) for o, n in zip(offset, arr.shape)
+            )]
+            for offset in self.offsets
+        ]
+
+    def arr2adjs(self, arr: np.array, length: int) -> np.array:
+        """Converts a lattice representation into an adjacency array, see
+        fastgraph.arr2adjs. Both -1 and 0 are treated as empty positions.
+
+        Args:
+            arr (np.array): Lattice representation of amino acid chain.
+            length (int): Number of amino acids.
+
+        Returns:
+            np.array: (length, neighbors) adjacency array.
+        """
+        arr = np.asarray(arr)
+        empty = np.where(arr > 0, arr, -1)
+        neighbors = np.stack(self.shifted(empty, -1), axis=-1)
+        placed = arr > 0
+        adjs = np.full((length, len(self.offsets)), -1)
+        adjs[arr[placed] - 1] = -np.sort(-neighbors[placed], axis=-1)
+        return adjs
+
+    def neighbors(self, position: tuple[int, ...]) -> list[tuple[int, ...]]:
+        """Returns the positions adjacent to a position, in direction order.
+
+        Args:
+            position: Coordinates of a position
+
+        Returns:
+            List: List of tuples of coordinates
+        """
+        return [tuple(x) for x in np.add(position, self.offsets).tolist()]
+
+def _signedperms(dim: int) -> list[np.array]:
+    # generators of the signed permutations of the axes
+    eye = np.eye(dim, dtype=int)
+    generators = [eye[list(perm)] for perm in itertools.permutations(range(dim))]
+    for axis in range(dim):
+        generators.append(np.diag([-1 if i == axis else 1 for i in range(dim)]))
+    return generators
+
+@lru_cache(maxsize=None)
+def hypercubic(dim: int) -> Lattice:
+    """Returns the hypercubic lattice of a dimension, with its full point group
+    of signed permutations of the axes.
+
+    Args:
+        dim (int): Dimension of the lattice
+
+    Returns:
+        Lattice: Square lattice for dim 2, cubic lattice for dim 3.
+    """
+    eye = np.eye(dim, dtype=int)
+    name = {2: "square", 3: "cubic"}.get(dim, "hypercubic{}".format(dim))
+    return Lattice(name, np.concatenate([eye, -eye]), _signedperms(dim))
+
+SQUARE = hypercubic(2)
+CUBIC = hypercubic(3)
+# axial coordinates, generated by a rotation by 60 degrees and a reflection
+TRIANGULAR = Lattice(
+    "triangular", [(1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1), (1, -1)],
+    [np.array([[0, -1], [1, 1]]), np.array([[0, 1], [1, 0]])]
+)
+# the 12 neighbors are the cubic positions with two coordinates off by one
+FCC = Lattice(
+    "fcc",
+    [
+        offset for offset in itertools.product((-1, 0, 1), repeat=3)
+        if sum(map(abs, offset)) == 2
+    ],
+    _signedperms(3)
+)
+
+LATTICES = {lat.name: lat for lat in (SQUARE, CUBIC, TRIANGULAR, FCC)}
+
+# file naming the lattice of the libraries of a directory
+LATTICEFILE = "lattice.txt"
+
+def byname(name: str) -> Lattice:
+    """Returns a lattice from its name.
+
+    Args:
+        name (str): Name of a lattice of LATTICES, or hypercubic{dim}.
+
+    Returns:
+        Lattice: The lattice
+    """
+    if name in LATTICES:
+        return LATTICES[name]
+    if name.startswith("hypercubic") and name[len("hypercubic"):].isdigit():
+        return hypercubic(int(name[len("hypercubic"):]))
+    raise ValueError("unknown lattice {}".format(name))
+
+def savelattice(dirname: str, lat: Lattice) -> None:
+    """Records the lattice of the libraries of a directory.
+
+    Args:
+        dirname (str): Directory of the libraries, for instance chains2.
+        lat (Lattice): Lattice of the libraries
+    """
+    with open(os.path.join(dirname, LATTICEFILE), "w") as f:
+        f.write(lat.name + "\n")
+
+def latticeof(fname: str, dim: int=2) -> Lattice:
+    """Returns the lattice of a library, as recorded by savelattice in its
+    directory. Directories saved before lattices were recorded only hold
+    hypercubic libraries, so the hypercubic lattice of dimension dim is
+    returned for them.
+
+    Args:
+        fname (str): Filename of the library, for instance chains2/14.npz.
+        dim (int, optional): Dimension of the chains. Defaults to 2.
+
+    Returns:
+        Lattice: Lattice of the library
+    """
+    try:
+        with open(os.path.join(os.path.dirname(fname), LATTICEFILE)) as f:
+            return byname(f.read().strip())
+    except FileNotFoundError:
+        return hypercubic(dim)
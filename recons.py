@@ -1,29 +1,25 @@
 import txt2graph
 from typing import Mapping, Iterable
 import numpy as np
+from lattice import Lattice, hypercubic
 
-def orthog(position: tuple[int, int]) -> list[tuple[int, int]]:
+def orthog(position: tuple[int, ...]) -> list[tuple[int, ...]]:
     """Returns a list of orthogonally adjacent positions to a given position on
-    a 2-D lattice.
+    a lattice of any dimension.
 
     Args:
-        position: An iterable of 2 ints representing coordinates in a 2-D
-            lattice.
+        position: An iterable of ints representing coordinates in a lattice.
     
     Returns:
-        List: List of tuples representing orthogonally adjacent positions in a
-        2-D lattice.
+        List: List of tuples representing orthogonally adjacent positions in
+        the lattice.
     """
-    return [
-        (position[0], position[1] + 1),
-        (position[0], position[1] - 1),
-        (position[0] + 1, position[1]),
-        (position[0] - 1, position[1])
-    ]
+    return hypercubic(len(position)).neighbors(position)
 
 def croparray(lattice: np.array, placeholder=0) -> np.array:
-    """Removes all placeholder elements from a 2-D array by returning the
-    smallest contigious view that contains non-placeholder elements.
+    """Removes all placeholder elements from an array of any dimension by
+    returning the smallest contigious view that contains non-placeholder
+    elements.
 
     Args:
         lattice: numpy array.
@@ -33,18 +29,9 @@ def croparray(lattice: np.array, placeholder=0) -> np.array:
     Returns:
         np.array: a view of the cropped numpy array
     """
-    minx, miny = float("inf"), float("inf")
-    maxx, maxy = float("-inf"), float("-inf")
-
-    for x, row in enumerate(lattice):
-        for y, entry in enumerate(row):
-            if entry != placeholder:
-                minx = min(minx, x)
-                maxx = max(maxx, x)
-                miny = min(miny, y)
-                maxy = max(maxy, y)
-    
-    return lattice[minx:maxx + 1, miny:maxy + 1]
+    coords = np.argwhere(lattice != placeholder)
+    mins, maxs = coords.min(axis=0), coords.max(axis=0)
+    return lattice[tuple(slice(x, y + 1) for x, y in zip(mins, maxs))]
 
 def pprint(lattice: np.array, frn: Iterable[tuple[int, int]]=None) -> None:
     """Prints the current lattice with fringe elements denoted.
@@ -78,33 +65,40 @@ def pprint(lattice: np.array, frn: Iterable[tuple[int, int]]=None) -> None:
             lat[f] = "??"
     print(lat[minx:maxx + 1, miny:maxy + 1])
 
-def reconstruct(adjl: Mapping[int, Iterable[int]]) -> np.array:
+def reconstruct(
+    adjl: Mapping[int, Iterable[int]], lat: Lattice=None
+) -> np.array:
     """Given an adjacency-DS representation of a graph, yields a (potentially)
     isomorphic array representing valid positions on a lattice of the vertices.
 
     Args:
         adjl: An adjacency-DS representation of a graph, mapping vertices to
             some iterable of their adjacent vertices.
+        lat: Lattice on which to place the vertices, whose neighbors drive the
+            reconstruction. Defaults to the square lattice. A ValueError is
+            raised when the deductions get stuck.
     
     Returns:
         np.array: A view of the reconstructed array
     """
+    if lat is None:
+        lat = hypercubic(2)
     # map from discovered degree to iterable of vertices
-    vtx = [set(adjl.keys()), set(), set(), set(), set()]
+    vtx = [set(adjl.keys())] + [set() for _ in lat.offsets]
     # map from vertex to discovered adjacencies
     discovered = {k: set() for k in adjl}
 
-    lattice = np.zeros([2 * len(adjl) - 1] * 2, dtype=int)
+    lattice = np.zeros([2 * len(adjl) - 1] * lat.dim, dtype=int)
     pos = {} # mapping vertices to their positions
     frn = set() # fringe coordinates
     placed = set() # placed vertices
 
-    def updatefrn(position: tuple[int, int]) -> None:
+    def updatefrn(position: tuple[int, ...]) -> None:
         """Helper subroutine to update potential fringe locations around a given
         vertex.
 
         Args:
-            position: A tuple representing the position to update in 2-D.
+            position: A tuple representing the position to update.
         """
         nonlocal lattice
         nonlocal frn
@@ -114,16 +108,16 @@ def reconstruct(adjl: Mapping[int, Iterable[int]]) -> np.array:
             return
         # compute the current discovered degree of the vertex
         degree = 0
-        for dev in orthog(position):
+        for dev in lat.neighbors(position):
             if lattice[dev] != 0:
                 degree += 1
         # if the vertex still has adjacencies, add neighboors to fringe
         # otherwise explicitly remove neighboors from fringe.
-        for dev in orthog(position):
+        for dev in lat.neighbors(position):
             if lattice[dev] == 0:
                 frn.add(dev) if degree != len(adjl[vertex]) else frn.discard(dev)
     
-    def updatearound(position: tuple[int, int]) -> None:
+    def updatearound(position: tuple[int, ...]) -> None:
         """Helper subroutine to update data structures when a given vertex is
         placed in a given position.
 
@@ -161,7 +155,7 @@ def reconstruct(adjl: Mapping[int, Iterable[int]]) -> np.array:
         
         # update fringes
         updatefrn(position)
-        for neighboor in orthog(position):
+        for neighboor in lat.neighbors(position):
             updatefrn(neighboor)
     
     def place1(vertex: int) -> None:
@@ -181,7 +175,9 @@ def reconstruct(adjl: Mapping[int, Iterable[int]]) -> np.array:
         candidates = set()
         for vtx in discovered[vertex]:
             if vtx in placed:
-                options = {p for p in orthog(pos[vtx]) if lattice[p] == 0}
+                options = {
+                    p for p in lat.neighbors(pos[vtx]) if lattice[p] == 0
+                }
                 if not candidates:
                     candidates = options
                 else:
@@ -202,7 +198,7 @@ def reconstruct(adjl: Mapping[int, Iterable[int]]) -> np.array:
         nonlocal lattice
         # find two neighboring fringe points
         for f in frn:
-            for neighboor in orthog(f):
+            for neighboor in lat.neighbors(f):
                 if neighboor in frn:
                     f1, f2 = f, neighboor
                     break
@@ -213,11 +209,11 @@ def reconstruct(adjl: Mapping[int, Iterable[int]]) -> np.array:
             return
         
         # find the vertices the fringe points are adjacent to
-        for neighboor in orthog(f1):
+        for neighboor in lat.neighbors(f1):
             vertex = lattice[neighboor]
             if vertex != 0:
                 f1v = vertex
-        for neighboor in orthog(f2):
+        for neighboor in lat.neighbors(f2):
             vertex = lattice[neighboor]
             if vertex != 0:
                 f2v = vertex
@@ -235,23 +231,30 @@ def reconstruct(adjl: Mapping[int, Iterable[int]]) -> np.array:
                     updatearound(f2)
 
  
-    # first two must be hand placed
-    lattice[len(adjl) - 1][len(adjl) - 1] = 1
-    lattice[len(adjl) - 1][len(adjl)] = 2
+    # first two must be hand placed, the second one step along the last axis
+    # on hypercubic lattices
+    first = (len(adjl) - 1,) * lat.dim
+    second = lat.neighbors(first)[lat.dim - 1]
+    lattice[first] = 1
+    lattice[second] = 2
 
-    updatearound((len(adjl) - 1, len(adjl) - 1))
-    updatearound((len(adjl) - 1, len(adjl)))
+    updatearound(first)
+    updatearound(second)
 
     # iterate until all vertices are found
     while len(placed) < len(adjl):
+        before = len(placed)
         # deductive
-        for d in [2, 3, 4]:
+        for d in range(2, len(lat.offsets) + 1):
             while vtx[d]:
                 for v in vtx[d]:
                     place1(v)
                     break
         # depth limited dfs
         place2()
+        # the deductions may not suffice on some lattices, do not loop forever
+        if len(placed) == before:
+            raise ValueError("no vertex can be placed by deduction")
     
     return croparray(lattice)
 
@@ -0,0 +1,129 @@
+import heapq
+import os
+import tempfile
+from typing import Iterable, Iterator
+
+"""spill.py
+
+External memory deduplication of fixed-size records. Records are buffered in
+memory up to a fixed number of distinct keys, then sorted and written to disk
+as a run. Iterating k-way merges the runs, yielding the first record of every
+key in key order, so memory use is bounded by the chunk size and the read
+buffers of the runs regardless of the number of records.
+
+A record is a bytes object whose first keysize bytes are its key. Records are
+ordered by their full bytes, so to keep the first record added for a key,
+follow the key with a big-endian sequence number.
+"""
+
+class SpillDedupe:
+    """Deduplicates fixed-size records by key using sorted runs on disk.
+
+    Fields:
+        keysize: Number of bytes of the key prefix of a record.
+        recsize: Number of bytes of a record.
+        chunk: Maximal number of distinct keys held in memory.
+        fanin: Maximal number of runs merged at once. Runs beyond it are
+        merged into larger runs first.
+        runs: Filenames of the sorted runs written so far.
+    """
+    def __init__(
+        self, keysize: int, recsize: int, chunk: int=1 << 20, fanin: int=64,
+        tmpdir: str=None
+    ):
+        """Initializer for the deduplicator. Consider class docstring for more
+        detail.
+
+        Args:
+            keysize (int): Number of bytes of the key prefix of a record
+            recsize (int): Number of bytes of a record
+            chunk (int, optional): Maximal number of distinct keys held in
+            memory. Defaults to 1 << 20.
+            fanin (int, optional): Maximal number of runs merged at once.
+            Defaults to 64.
+            tmpdir (str, optional): Directory in which to create the runs.
+            Defaults to the system temporary directory.
+        """
+        self.keysize = keysize
+        self.recsize = recsize
+        self.chunk = chunk
+        self.fanin = max(fanin, 2)
+        self.runs = []
+        self._buffer = {}
+        self._written = 0
+        self._dir = tempfile.TemporaryDirectory(prefix="spill", dir=tmpdir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Removes the runs from disk."""
+        self._buffer = {}
+        self.runs = []
+        self._dir.cleanup()
+
+    def add(self, record: bytes) -> None:
+        """Adds a record, spilling the buffer to disk once it holds chunk keys.
+
+        Args:
+            record (bytes): Record of recsize bytes
+        """
+        key = record[:self.keysize]
+        old = self._buffer.get(key)
+        if old is None or record < old:
+            self._buffer[key] = record
+            if len(self._buffer) >= self.chunk:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        self.runs.append(self._write(sorted(self._buffer.values())))
+        self._buffer = {}
+
+    def _write(self, records: Iterable[bytes]) -> str:
+        self._written += 1
+        fname = os.path.join(self._dir.name, "{}.run".format(self._written))
+        with open(fname, "wb") as f:
+            for record in records:
+                f.write(record)
+        return fname
+
+    def _read(self, fname: str) -> Iterator[bytes]:
+        size = self.recsize
+        with open(fname, "rb") as f:
+            while True:
+                block = f.read(size * 4096)
+                if not block:
+                    return
+                for start in range(0, len(block), size):
+                    yield block[start:start + size]
+
+    def _merge(self, runs: list) -> Iterator[bytes]:
+        last = None
+        for record in heapq.merge(*(self._read(run) for run in runs)):
+            key = record[:self.keysize]
+            if key != last:
+                last = key
+                yield record
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Yields the first record of every key, in key order.
+
+        Yields:
+            Iterator[bytes]: Records
+        """
+        self._flush()
+        # merge in passes until few enough runs are left to be open at once
+        while len(self.runs) > self.fanin:
+            merged = []
+            for start in range(0, len(self.runs), self.fanin):
+                group = self.runs[start:start + self.fanin]
+                merged.append(self._write(self._merge(group)))
+                for run in group:
+                    os.remove(run)
+            self.runs = merged
+        return self._merge(self.runs)
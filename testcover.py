@@ -0,0 +1,123 @@
+import argparse
+import heapq
+import numpy as np
+import approx
+import contactindex
+import distinguish
+import txt2graph
+from lattice import Lattice
+
+"""testcover.py
+
+Finds a single set of edges (probes) which, when probed, distinguishes every
+graph of a list from every other one: the test cover problem. This differs
+from approx.minhitset, which finds a separate edge set per graph.
+
+The greedy solver keeps the partition of the graphs induced by the probes
+chosen so far, and repeatedly adds the edge separating the most pairs of
+graphs still in the same block. Since the gain of an edge can only decrease
+as the partition gets finer, gains are evaluated lazily (CELF): edges wait in
+a heap keyed by a stale gain, and only the top of the heap is re-evaluated
+until its fresh gain still beats the next stale one.
+"""
+
+def _gain(labels: np.array, col: np.array, sizes: np.array) -> int:
+    # pairs in the same block with exactly one of them having the edge
+    ones = np.bincount(labels, weights=col, minlength=len(sizes))
+    return int((ones * (sizes - ones)).sum())
+
+def testcover(has: np.array) -> tuple[list, list]:
+    """Greedily finds edges distinguishing every graph from every other one.
+
+    Args:
+        has (np.array): (graphs, edges) boolean array, whether a graph has an
+        edge.
+
+    Returns:
+        tuple: List of the chosen columns of has, in order, and list of the
+        groups (as lists of indices) of graphs no edge distinguishes.
+    """
+    graphs, edges = has.shape
+    labels = np.zeros(graphs, dtype=int)
+    sizes = np.bincount(labels, minlength=1)
+    heap = [(-_gain(labels, has[:, e], sizes), e) for e in range(edges)]
+    heapq.heapify(heap)
+
+    probes = []
+    while heap and len(sizes) < graphs:
+        _, e = heapq.heappop(heap)
+        gain = _gain(labels, has[:, e], sizes)
+        if heap and gain < -heap[0][0]:
+            # stale, wait for its turn again
+            heapq.heappush(heap, (-gain, e))
+            continue
+        if gain == 0:
+            # the best edge separates nothing, neither will the others
+            break
+        probes.append(e)
+        _, labels = np.unique(labels * 2 + has[:, e], return_inverse=True)
+        sizes = np.bincount(labels)
+
+    groups = [
+        np.flatnonzero(labels == block).tolist()
+        for block in np.flatnonzero(sizes > 1)
+    ]
+    return probes, groups
+
+def matprobes(mats: list) -> tuple[list, list]:
+    """Finds probes distinguishing a list of adjacency matrices.
+
+    Args:
+        mats (list): List of adjacency matrices of the same size
+
+    Returns:
+        tuple: List of edges and list of groups of indistinguishable graphs.
+    """
+    dist = distinguish.Distinguisher(mats)
+    probes, groups = testcover(dist.has)
+    return [dist.edges[e] for e in probes], groups
+
+def libraryprobes(fname: str, lat: Lattice=None) -> tuple[list, list]:
+    """Finds contacts distinguishing the chains of a library, reading their
+    contacts from its index (see contactindex).
+
+    Args:
+        fname (str): Filename of the library, for instance chains2/14.npz.
+        lat (Lattice, optional): Lattice of the library. Defaults to the one
+        recorded next to it, see lattice.latticeof.
+
+    Returns:
+        tuple: List of contacts, 0-indexed, and list of groups of chains with
+        the same contacts.
+    """
+    index = contactindex.loadindex(fname, lat)
+    has = np.zeros((index["chains"], len(index["codes"])), dtype=bool)
+    indptr = index["indptr"]
+    for e, (start, end) in enumerate(zip(indptr[:-1], indptr[1:])):
+        has[index["ids"][start:end], e] = True
+    probes, groups = testcover(has)
+    contacts = [divmod(int(index["codes"][e]), index["length"]) for e in probes]
+    return contacts, groups
+
+def main():
+    parser = argparse.ArgumentParser(description="Find a global probe set.")
+    parser.add_argument("fname", nargs="?", default="compact.txt")
+    args = parser.parse_args()
+    if args.fname.endswith(".npz"):
+        probes, groups = libraryprobes(args.fname)
+        print("{} probes for {} groups left".format(len(probes), len(groups)))
+        print(probes)
+        return
+
+    mats = txt2graph.mats(args.fname)
+    probes, groups = matprobes(mats)
+    pergraph = [edges for edges in approx.minhitset(mats) if edges]
+    union = set().union(*pergraph)
+    print("{} probes for {} groups left".format(len(probes), len(groups)))
+    print("per graph: {} distinct edges, {} at most for one graph".format(
+        len(union), max((len(edges) for edges in pergraph), default=0)
+    ))
+    print(probes)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
+import hashlib
 import numpy as np
+from atomic import atomicwrite
+from lattice import Lattice, hypercubic
+
+# bump whenever the derivation of cached matrices changes
+CACHEVERSION = 2
 
 def readints(s: str) -> list:
     """Helper function that reads in a line of integers in the form of a space
@@ -47,42 +53,43 @@ def read(fname: str) -> np.array:
         chains.append(np.array(chain))
     return chains
 
-def arr2adjl(arr: np.array) -> dict:
+def arr2adjl(arr: np.array, lat: Lattice=None) -> dict:
     """Interprets numpy array of integer entries as a lattice graph, and returns
     an adjacency list representation using a dictionary mapping integer entries
-    to a list of adjacent integers.
+    to a list of adjacent integers. The array may have any number of
+    dimensions.
 
     Args:
         arr (np.array): Array of integers
+        lat (Lattice, optional): Lattice of the array. Defaults to the
+        hypercubic lattice of the dimension of arr.
 
     Returns:
         dict: Adjacency list
     """
     dic = {}
-    # To avoid numerous if statements, we map the numpy array into one of size
-    # (n + 2) x (n + 2), and pad the border with zeros. Then for each element
-    # we can simply look at its 4 neighbors, and treat the zeros later.
-    new = np.zeros((len(arr) + 2, len(arr[0]) + 2), dtype=int)
-    for i, row in enumerate(arr):
-        for j, entry in enumerate(row):
-            new[i + 1][j + 1] = arr[i][j]
-    
-    for i, row in enumerate(new):
-        for j, entry in enumerate(row):
-            # ignore placeholders
-            if entry == 0 or entry == -1:
-                continue
-            if entry not in dic:
-                dic[entry] = set()
-            dic[entry].add(new[i - 1][j])
-            dic[entry].add(new[i][j - 1])
-            dic[entry].add(new[i + 1][j])
-            dic[entry].add(new[i][j + 1])
-    
+    arr = np.asarray(arr, dtype=int)
+    if lat is None:
+        lat = hypercubic(arr.ndim)
+    # To avoid numerous if statements, we look at the neighbors of every entry
+    # in each direction at once, with zeros past the border, and treat the
+    # zeros later.
+    shifted = lat.shifted(arr, 0)
+
+    for idx in zip(*np.nonzero(arr)):
+        entry = arr[idx]
+        # ignore placeholders
+        if entry == -1:
+            continue
+        if entry not in dic:
+            dic[entry] = set()
+        for neighbors in shifted:
+            dic[entry].add(neighbors[idx])
+
     for entry, adjset in dic.items():
         if 0 in adjset:
             adjset.remove(0)
-    
+
     return dic
 
 # converts adjacency lists to arrays, ignoring 0s
@@ -107,18 +114,107 @@ def adjl2mat(d: dict) -> np.array:
             mat[key - 1][val - 1] = mat[val - 1][key - 1] = 1
     return mat
 
-def mats(fname: str) -> list:
+def mats(fname: str, cache: bool=True) -> list:
     """Returns a list of adjacency matrices from a file containing entries of
-    matrices.
+    matrices. By default the matrices are read from and written to a sidecar
+    cache, see loadcache.
 
     Args:
         fname (str): Filename
+        cache (bool, optional): Whether to use the sidecar cache. Defaults to
+        True.
 
     Returns:
         list: List of adjacency matrices
     """
+    if cache:
+        return loadcache(fname)
     return [adjl2mat(arr2adjl(arr)) for arr in read(fname)]
 
+def filehash(fname: str) -> str:
+    """Computes the SHA-256 hex digest of the contents of a file.
+
+    Args:
+        fname (str): Filename
+
+    Returns:
+        str: Hex digest
+    """
+    h = hashlib.sha256()
+    with open(fname, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def cachename(fname: str) -> str:
+    """Name of the sidecar cache of a file.
+
+    Args:
+        fname (str): Filename
+
+    Returns:
+        str: Sidecar filename
+    """
+    return fname + ".cache.npz"
+
+def savecache(fname: str) -> list:
+    """Derives the adjacency matrices of a file containing entries of matrices,
+    and stores them in its sidecar cache along with the hash of the file and
+    CACHEVERSION. The sidecar is written atomically (see
+    atomic.atomicwrite), so a partial cache is never read. If it cannot be
+    written, for instance next to a read only file, the result is returned
+    uncached.
+
+    Matrices are stored as a single zero padded (count, n, n) array with their
+    sizes.
+
+    Args:
+        fname (str): Filename
+
+    Returns:
+        list: List of adjacency matrices
+    """
+    digest = filehash(fname)
+    res = mats(fname, cache=False)
+
+    sizes = np.array([len(mat) for mat in res], dtype=int)
+    size = sizes.max(initial=0)
+    stacked = np.zeros((len(res), size, size), dtype=np.int8)
+    for i, mat in enumerate(res):
+        stacked[i, :len(mat), :len(mat)] = mat
+
+    try:
+        with atomicwrite(cachename(fname)) as f:
+            np.savez(
+                f, version=CACHEVERSION, hash=digest, mats=stacked,
+                sizes=sizes
+            )
+    except OSError:
+        pass
+    return res
+
+def loadcache(fname: str) -> list:
+    """Returns the adjacency matrices of a file containing entries of matrices
+    from its sidecar cache in one read, provided the cache was
+    written for the current contents of the file and the current
+    CACHEVERSION. Otherwise the cache is rebuilt with savecache.
+
+    Args:
+        fname (str): Filename
+
+    Returns:
+        list: List of adjacency matrices
+    """
+    try:
+        with np.load(cachename(fname)) as data:
+            if data["version"] != CACHEVERSION or data["hash"] != filehash(fname):
+                return savecache(fname)
+            stacked, sizes = data["mats"], data["sizes"]
+    except (OSError, KeyError, ValueError):
+        return savecache(fname)
+
+    return [stacked[i, :n, :n].astype(int) for i, n in enumerate(sizes)]
+
 def edgeset(mat):
     """Returns the set of edges for a given adjacency matrix
 
@@ -217,14 +313,8 @@ def mat2adjs(mat: np.array, inclself: bool=False) -> dict[int, set[int]]:
 
 
 def main():
-    with open("mats.txt", "w") as f:
-        for mat in mats("compact.txt"):
-            for row in mat:
-                f.write(str(row[0]))
-                for entry in row[1:]:
-                    f.write(" {}".format(entry))
-                f.write("\n")
-            f.write("\n")
+    # warm the sidecar cache of compact.txt for the other scripts
+    savecache("compact.txt")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file